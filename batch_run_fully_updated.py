@@ -5,7 +5,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service as ChromeService
 from cred import *
-from dataset_writer import save_validation_sample, save_analysis_sample
+from dataset_writer import save_validation_sample, save_analysis_sample, parse_analysis_message, ANALYSIS_INSTRUCTION
+from snapshot_store import SnapshotStore, file_hash, SECTION_SNAPSHOT, ANALYSIS_SNAPSHOT
 import time
 import os
 from datetime import datetime
@@ -13,6 +14,7 @@ import logging
 import concurrent.futures
 import threading
 import shutil
+import uuid
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -186,7 +188,21 @@ def send_email_notification(subject, body, attachment_path=None,
     except Exception as e:
         logging.error(f"Error preparing email: {e}")
 
-def process_single_pdf(driver, pdf_path, sections_to_visit):
+def save_section_snapshot(driver, store, pdf_path, pdf_hash, run_id, section, kind=SECTION_SNAPSHOT, prompt=None):
+    """
+    Saves the current '#validation-container' HTML to the snapshot store so the
+    datasets can be re-extracted offline. Failures are logged and ignored.
+    """
+    if store is None:
+        return
+    try:
+        container = driver.find_element(By.CSS_SELECTOR, "#validation-container")
+        html = container.get_attribute("outerHTML")
+        store.save_snapshot(pdf_path, pdf_hash, run_id, section, html, kind=kind, prompt=prompt)
+    except Exception as e:
+        logging.warning(f"  ⚠️ Warning: Could not save snapshot for section '{section}': {e}")
+
+def process_single_pdf(driver, pdf_path, sections_to_visit, snapshot_store=None):
     """
     Uploads and processes a single PDF file within an existing browser session.
  
@@ -194,13 +210,18 @@ def process_single_pdf(driver, pdf_path, sections_to_visit):
         driver: The active Selenium webdriver instance.
         pdf_path (str): The absolute path to the PDF file to upload.
         sections_to_visit (dict): A dictionary of section names and their URL keys.
+        snapshot_store (SnapshotStore): Optional store for section DOM snapshots.
     """
     log_data = {}
+    pdf_hash = None
+    run_id = uuid.uuid4().hex # Groups this review's snapshots in the store
     start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     end_time = start_time # Initialize end_time
     retries = 0
     try:
         logging.debug(f"On upload page: {driver.title}")
+        if snapshot_store is not None:
+            pdf_hash = file_hash(pdf_path)
  
         # --- PDF Upload ---
         max_upload_retries = 3
@@ -285,6 +306,8 @@ def process_single_pdf(driver, pdf_path, sections_to_visit):
                 else:
                     logging.debug("  No validation messages found.")
                 # --- 🔑 END IMPLEMENTATION FIX ---
+
+                save_section_snapshot(driver, snapshot_store, pdf_path, pdf_hash, run_id, display_name)
  
             except Exception as section_e:
                 error_message = f"Could not process section '{display_name}': {section_e}"
@@ -338,22 +361,23 @@ def process_single_pdf(driver, pdf_path, sections_to_visit):
 
                                 # --- DATASET WRITER INTEGRATION for LLM ---
                                 # Parse prompt and response to save for LLM fine-tuning
-                                if message_text.startswith("Prompt '"):
-                                    try:
-                                        parts = message_text.split(":", 1)
-                                        prompt_part = parts[0]
-                                        output_part = parts[1].strip()
-                                        prompt_name = prompt_part.replace("Prompt '", "").replace("'", "")
+                                try:
+                                    parsed = parse_analysis_message(message_text)
+                                    if parsed:
+                                        prompt_name, output_part = parsed
                                         save_analysis_sample(
                                             pdf=pdf_path,
-                                            prompt=f"Analyze the appraisal report for the following: {prompt_name}",
+                                            prompt=ANALYSIS_INSTRUCTION.format(prompt_name),
                                             output=output_part
                                         )
-                                    except IndexError:
-                                        logging.warning(f"  ⚠️ Warning: Could not parse custom analysis prompt for dataset: {message_text}")
+                                except IndexError:
+                                    logging.warning(f"  ⚠️ Warning: Could not parse custom analysis prompt for dataset: {message_text}")
                         else:
                             logging.debug("  No validation messages found.")
                         # --- 🔑 END IMPLEMENTATION FIX ---
+
+                        save_section_snapshot(driver, snapshot_store, pdf_path, pdf_hash, run_id, display_name,
+                                              kind=ANALYSIS_SNAPSHOT, prompt=prompt_text)
  
                 except Exception as custom_analysis_e:
                     error_msg = f"An error occurred during Custom Analysis: {custom_analysis_e}"
@@ -370,6 +394,11 @@ def process_single_pdf(driver, pdf_path, sections_to_visit):
         # Wait to be redirected back to the upload page for the next PDF
         WebDriverWait(driver, 20).until(EC.title_contains("Full File Review"))
         logging.debug("Review finished. Ready for next file.")
+        if snapshot_store is not None:
+            try:
+                snapshot_store.mark_complete(pdf_path, pdf_hash, run_id)
+            except Exception as e:
+                logging.warning(f"  ⚠️ Warning: Could not mark snapshots as complete: {e}")
         return True
  
     except Exception as e:
@@ -399,7 +428,7 @@ def perform_logout(driver):
     except Exception as e:
         logging.warning(f"Logout failed: {e}")
 
-def process_pdf_task(pdf_filename, pdf_directory, website_url, sections):
+def process_pdf_task(pdf_filename, pdf_directory, website_url, sections, snapshot_store=None):
     """
     Worker function to process a single PDF in a separate thread/driver.
     """
@@ -456,7 +485,7 @@ def process_pdf_task(pdf_filename, pdf_directory, website_url, sections):
             WebDriverWait(driver, 10).until(EC.title_contains("Review"))
             
             # --- Process PDF ---
-            success = process_single_pdf(driver, absolute_pdf_path, sections)
+            success = process_single_pdf(driver, absolute_pdf_path, sections, snapshot_store)
             
             if timed_out:
                 raise TimeoutError("Task timed out during processing")
@@ -567,6 +596,12 @@ if __name__ == "__main__":
     # --- Parallel Processing ---
     # Adjust max_workers based on your system's capabilities (CPU/RAM)
     MAX_WORKERS = 4 
+
+    # Optionally capture section DOM snapshots for offline re-extraction (see snapshot_store.py)
+    snapshot_dir = os.environ.get("SNAPSHOT_DIR")
+    snapshot_store = SnapshotStore(snapshot_dir) if snapshot_dir else None
+    if snapshot_store:
+        logging.info(f"Saving section snapshots to '{os.path.abspath(snapshot_dir)}'")
     logging.info(f"Starting parallel processing with {MAX_WORKERS} workers...")
     
     start_time = datetime.now()
@@ -577,7 +612,7 @@ if __name__ == "__main__":
     try:
         with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
             future_to_pdf = {
-                executor.submit(process_pdf_task, pdf, absolute_pdf_dir, website_url, sections): pdf
+                executor.submit(process_pdf_task, pdf, absolute_pdf_dir, website_url, sections, snapshot_store): pdf
                 for pdf in pdf_files_to_process
             }
             
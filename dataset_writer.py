@@ -8,22 +8,47 @@ os.makedirs(DATASET_DIR, exist_ok=True)
 VALIDATION_FILE = os.path.join(DATASET_DIR, "validation_dataset.jsonl")
 ANALYSIS_FILE = os.path.join(DATASET_DIR, "analysis_dataset.jsonl")
 
-def save_validation_sample(pdf, section, message):
-    record = {
+ANALYSIS_INSTRUCTION = "Analyze the appraisal report for the following: {}"
+
+def parse_analysis_message(message):
+    """
+    Splits a custom analysis message ("Prompt '<name>': <output>") into its
+    prompt name and output. Returns None for any other message.
+
+    Raises:
+        IndexError: If the message starts like a prompt but has no output.
+    """
+    if not message.startswith("Prompt '"):
+        return None
+    parts = message.split(":", 1)
+    prompt_part = parts[0]
+    output_part = parts[1].strip()
+    prompt_name = prompt_part.replace("Prompt '", "").replace("'", "")
+    return prompt_name, output_part
+
+def validation_record(pdf, section, message, created_at=None):
+    return {
         "pdf": os.path.basename(pdf),
         "section": section,
         "text": message,
         "label": message,
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": created_at or datetime.utcnow().isoformat()
     }
-    with open(VALIDATION_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record) + "\n")
 
-def save_analysis_sample(pdf, prompt, output):
-    record = {
+def analysis_record(pdf, prompt, output):
+    return {
         "instruction": prompt,
         "input": f"PDF: {os.path.basename(pdf)}",
         "output": output
     }
-    with open(ANALYSIS_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record) + "\n")
+
+def append_records(path, records):
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+def save_validation_sample(pdf, section, message):
+    append_records(VALIDATION_FILE, [validation_record(pdf, section, message)])
+
+def save_analysis_sample(pdf, prompt, output):
+    append_records(ANALYSIS_FILE, [analysis_record(pdf, prompt, output)])
@@ -0,0 +1,332 @@
+"""
+Content-addressed store for section DOM snapshots and offline re-extraction.
+
+When SNAPSHOT_DIR is set, the batch run saves the "#validation-container" HTML
+of every reviewed section (and of every custom analysis prompt) here. Each
+snapshot is gzip-compressed and stored once under the SHA-256 of its HTML; a
+manifest maps (PDF hash, review run, section, prompt) to the stored object, and
+marks the review runs that completed.
+
+The extractor streams those snapshots back through the same message parsing and
+dataset-writing code as the live review, so the datasets can be rebuilt after a
+parsing change without re-uploading any PDF.
+
+Usage:
+    python snapshot_store.py extract --output-dir datasets_rebuilt --workers 8
+"""
+import argparse
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+from html.parser import HTMLParser
+
+from dataset_writer import (
+    ANALYSIS_INSTRUCTION,
+    analysis_record,
+    append_records,
+    parse_analysis_message,
+    validation_record,
+)
+
+SECTION_SNAPSHOT = "section"
+ANALYSIS_SNAPSHOT = "custom_analysis"
+# Manifest entry (without an object) recorded when a review reaches "Finish Review"
+COMPLETE_MARKER = "complete"
+
+MANIFEST_NAME = "manifest.jsonl"
+OBJECTS_DIR = "objects"
+
+def object_path(store_root, object_hash):
+    """Returns the path of a stored object inside a snapshot store directory."""
+    return os.path.join(store_root, OBJECTS_DIR, object_hash[:2], f"{object_hash}.html.gz")
+
+def read_object(store_root, object_hash):
+    """Returns the decompressed HTML of a stored object."""
+    with open(object_path(store_root, object_hash), "rb") as f:
+        return gzip.decompress(f.read()).decode("utf-8")
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class SnapshotStore:
+    """
+    A directory of compressed HTML objects keyed by content hash, plus a
+    manifest of which PDF/section each capture belongs to.
+
+    Safe to share between the batch worker threads.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, OBJECTS_DIR), exist_ok=True)
+
+    def object_path(self, object_hash):
+        return object_path(self.root, object_hash)
+
+    def put(self, html):
+        """Stores the HTML if not already present and returns its content hash."""
+        data = html.encode("utf-8")
+        object_hash = hashlib.sha256(data).hexdigest()
+        path = self.object_path(object_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so a concurrent reader never sees a partial object
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(data, mtime=0))
+            os.replace(tmp_path, path)
+        return object_hash
+
+    def get(self, object_hash):
+        return read_object(self.root, object_hash)
+
+    def save_snapshot(self, pdf_path, pdf_hash, run_id, section, html, kind=SECTION_SNAPSHOT, prompt=None):
+        """
+        Stores a section snapshot and records it in the manifest.
+
+        Args:
+            pdf_path (str): Path of the reviewed PDF (only the file name is kept).
+            pdf_hash (str): SHA-256 of the PDF contents, see file_hash.
+            run_id (str): Identifies the review the snapshot was taken in.
+            section (str): Display name of the section.
+            html (str): The outerHTML of the validation container.
+            kind (str): SECTION_SNAPSHOT or ANALYSIS_SNAPSHOT.
+            prompt (str): The custom analysis prompt that produced the snapshot.
+        """
+        entry = {
+            "pdf": os.path.basename(pdf_path),
+            "pdf_hash": pdf_hash,
+            "run_id": run_id,
+            "section": section,
+            "kind": kind,
+            "prompt": prompt,
+            "object": self.put(html),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            append_records(self.manifest_path, [entry])
+        return entry
+
+    def mark_complete(self, pdf_path, pdf_hash, run_id):
+        """Records in the manifest that a review run finished all its sections."""
+        entry = {
+            "pdf": os.path.basename(pdf_path),
+            "pdf_hash": pdf_hash,
+            "run_id": run_id,
+            "kind": COMPLETE_MARKER,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            append_records(self.manifest_path, [entry])
+        return entry
+
+    def entries(self, latest_only=True):
+        """
+        Yields the snapshot entries of the manifest in capture order.
+
+        Args:
+            latest_only (bool): Keep only the snapshots of one review run per
+                PDF, so sections from different reviews are never mixed: the
+                most recent completed run, or the most recent run if none of
+                them completed.
+        """
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        snapshots = [entry for entry in entries if entry["kind"] != COMPLETE_MARKER]
+        if latest_only:
+            # A run's last manifest entry decides how recent it is
+            latest_run, latest_complete_run = {}, {}
+            for entry in entries:
+                runs = latest_complete_run if entry["kind"] == COMPLETE_MARKER else latest_run
+                if entry["created_at"] >= runs.get(entry["pdf_hash"], (None, ""))[1]:
+                    runs[entry["pdf_hash"]] = (entry.get("run_id"), entry["created_at"])
+            selected = {**latest_run, **latest_complete_run}
+            snapshots = [entry for entry in snapshots if entry.get("run_id") == selected[entry["pdf_hash"]][0]]
+        yield from snapshots
+
+class _ValidationMessageParser(HTMLParser):
+    """
+    Collects the text of ".validation-message" elements, approximating what
+    Selenium's WebElement.text returns for them.
+    """
+
+    BLOCK_TAGS = {"br", "div", "p", "li", "ul", "ol", "tr", "table", "pre",
+                  "h1", "h2", "h3", "h4", "h5", "h6"}
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+                 "meta", "param", "source", "track", "wbr"}
+    SKIP_TAGS = {"script", "style", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.messages = []
+        self._parts = None
+        self._depth = 0
+        self._skip_depth = 0
+        self._pre_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_TAGS:
+            if self._parts is not None and tag == "br":
+                self._parts.append("\n")
+            return
+        if self._parts is None:
+            classes = (dict(attrs).get("class") or "").split()
+            if "validation-message" in classes:
+                self._parts = []
+                self._depth = 1
+            return
+        self._depth += 1
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+        if tag == "pre":
+            self._pre_depth += 1
+
+    def handle_endtag(self, tag):
+        if self._parts is None or tag in self.VOID_TAGS:
+            return
+        self._depth -= 1
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+        if tag == "pre":
+            self._pre_depth = max(0, self._pre_depth - 1)
+        if self._depth == 0:
+            self.messages.append(_normalize_text("".join(self._parts)))
+            self._parts = None
+
+    def handle_data(self, data):
+        if self._parts is not None and not self._skip_depth:
+            # Source line breaks are plain whitespace outside <pre>, as in the browser
+            self._parts.append(data if self._pre_depth else re.sub(r"\s+", " ", data))
+
+def _normalize_text(text):
+    # WebElement.text renders non-breaking spaces as normal spaces
+    text = text.replace("\xa0", " ")
+    lines = (re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def extract_messages(html):
+    """Returns the validation message texts contained in a snapshot's HTML."""
+    parser = _ValidationMessageParser()
+    parser.feed(html)
+    parser.close()
+    return [message for message in parser.messages if message]
+
+def snapshot_records(entry, html):
+    """
+    Rebuilds the dataset records a live review would have written for one
+    snapshot.
+
+    Returns:
+        tuple: (validation_records, analysis_records)
+    """
+    validation_records, analysis_records = [], []
+    for message_text in extract_messages(html):
+        if entry["kind"] == SECTION_SNAPSHOT:
+            validation_records.append(
+                validation_record(entry["pdf"], entry["section"], message_text, created_at=entry["created_at"])
+            )
+            continue
+        try:
+            parsed = parse_analysis_message(message_text)
+        except IndexError:
+            logging.warning(f"Could not parse custom analysis prompt for dataset: {message_text}")
+            continue
+        if parsed:
+            prompt_name, output = parsed
+            analysis_records.append(
+                analysis_record(entry["pdf"], ANALYSIS_INSTRUCTION.format(prompt_name), output)
+            )
+    return validation_records, analysis_records
+
+def _extract_entry(args):
+    store_root, entry = args
+    try:
+        html = read_object(store_root, entry["object"])
+    except FileNotFoundError:
+        logging.warning(f"Snapshot object {entry['object']} for '{entry['pdf']}' / {entry['section']} is missing. Skipping.")
+        return None
+    return snapshot_records(entry, html)
+
+def extract_datasets(store_root, output_dir, workers=None, all_runs=False):
+    """
+    Rebuilds the validation and analysis datasets from stored snapshots.
+
+    Snapshots are decompressed and parsed in a process pool; records are
+    written by this process in manifest order.
+
+    Args:
+        store_root (str): Snapshot store directory.
+        output_dir (str): Directory for the rebuilt dataset files. Existing
+            files in it are replaced.
+        workers (int): Number of worker processes (defaults to the CPU count).
+        all_runs (bool): Extract the snapshots of every review run instead of
+            one run per PDF (see SnapshotStore.entries).
+
+    Returns:
+        tuple: (snapshot count, validation record count, analysis record count)
+    """
+    store = SnapshotStore(store_root)
+    os.makedirs(output_dir, exist_ok=True)
+    validation_path = os.path.join(output_dir, "validation_dataset.jsonl")
+    analysis_path = os.path.join(output_dir, "analysis_dataset.jsonl")
+    for path in (validation_path, analysis_path):
+        open(path, "w", encoding="utf-8").close()
+
+    snapshots = validation_count = analysis_count = skipped = 0
+    tasks = ((store_root, entry) for entry in store.entries(latest_only=not all_runs))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(_extract_entry, tasks, chunksize=64):
+            if result is None:
+                skipped += 1
+                continue
+            validation_records, analysis_records = result
+            append_records(validation_path, validation_records)
+            append_records(analysis_path, analysis_records)
+            snapshots += 1
+            validation_count += len(validation_records)
+            analysis_count += len(analysis_records)
+    if skipped:
+        logging.warning(f"Skipped {skipped} snapshot(s) with missing objects.")
+    return snapshots, validation_count, analysis_count
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    parser = argparse.ArgumentParser(description="Offline re-extraction of datasets from section snapshots.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    extract_parser = subparsers.add_parser("extract", help="Rebuild the datasets from stored snapshots.")
+    extract_parser.add_argument("--snapshot-dir", default=os.environ.get("SNAPSHOT_DIR", "snapshots"))
+    extract_parser.add_argument("--output-dir", default="datasets_rebuilt")
+    extract_parser.add_argument("--workers", type=int, default=None)
+    extract_parser.add_argument("--all-runs", action="store_true",
+                                help="Extract every review run instead of the latest completed run of each PDF.")
+    args = parser.parse_args()
+
+    start_time = datetime.now()
+    snapshots, validation_count, analysis_count = extract_datasets(
+        args.snapshot_dir, args.output_dir, args.workers, all_runs=args.all_runs
+    )
+    logging.info(
+        f"Re-extracted {snapshots} snapshot(s) into {validation_count} validation and "
+        f"{analysis_count} analysis record(s) in {args.output_dir} ({datetime.now() - start_time})."
+    )
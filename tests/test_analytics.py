@@ -0,0 +1,201 @@
+import json
+import os
+
+import pytest
+
+from analytics import MessageIndex, load_datasets, load_review_log, parse_message, template_id
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "datasets", "validation_dataset.jsonl")
+
+
+@pytest.fixture(scope="module")
+def dataset_texts():
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        return {json.loads(line)["text"] for line in f if line.strip()}
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("⚠️ 'Offered for Sale' is 'Yes' but missing details: MLS.",
+     ("warning", "'Offered for Sale' is 'Yes' but missing details: {}", ("MLS",))),
+    ("⚠️ 'Offered for Sale' is 'Yes' but missing details: Listing Date.",
+     ("warning", "'Offered for Sale' is 'Yes' but missing details: {}", ("Listing Date",))),
+    ("✅ Zip Code (76449) is valid.",
+     ("pass", "Zip Code ({}) is valid.", ("76449",))),
+    ("✅ Subject property state detected: TX",
+     ("pass", "Subject property state detected: {}", ("TX",))),
+    ("✅ All required fields are present.",
+     ("pass", "All required fields are present.", ())),
+    ("ℹ️ PUD is 'Yes'. Ensure 'PUD Info' section is filled.",
+     ("info", "PUD is 'Yes'. Ensure 'PUD Info' section is filled.", ())),
+    ("⚠️ PUD is 'Yes': Verify that 'HOA $' is a number > 0 and 'HOA(per year/per month)' is filled.",
+     ("warning", "PUD is 'Yes': Verify that 'HOA $' is a number > {} and 'HOA(per year/per month)' is filled.", ("0",))),
+    ('ℹ️ Address Consistency: Verify that "1215 McGinnis Pt, Graford, TX, 76449" matches the Sales Grid, '
+     'Location Map, Aerial Map, and Subject Photos.',
+     ("info", 'Address Consistency: Verify that "{}" matches the Sales Grid, Location Map, Aerial Map, '
+              'and Subject Photos.', ("1215 McGinnis Pt, Graford, TX, 76449",))),
+])
+def test_parse_dataset_messages(dataset_texts, message, expected):
+    assert message in dataset_texts
+    assert parse_message(message) == expected
+
+
+def test_parse_keeps_lowercase_tail_in_template():
+    severity, template, params = parse_message("⚠️ Subject Address/Photo Check Failed: Issues found.")
+    assert template == "Subject Address/Photo Check Failed: Issues found."
+    assert params == ()
+
+
+def test_parse_custom_analysis_prompt():
+    severity, template, params = parse_message("Prompt 'GLA Check': The GLA is 1,850 sq ft.\nNo issues.")
+    assert severity == "unknown"
+    assert template == "Prompt '{}': {}"
+    assert params == ("GLA Check", "The GLA is 1,850 sq ft.\nNo issues.")
+
+
+def test_parse_error_entry():
+    assert parse_message("ERROR: Could not process section 'Subject': timeout")[0] == "error"
+
+
+def test_template_id_depends_on_severity():
+    assert template_id("pass", "Photo Label Check") != template_id("warning", "Photo Label Check")
+
+
+REPORT = """
+================================================================================
+
+Appraisal Review Log Report
+==============================
+
+File Name: a.pdf
+Start Time: 2026-02-17 13:00:00
+End Time: 2026-02-17 13:05:00
+Retries: 0
+
+--- Subject ---
+[13:01:02] - ✅ Subject property state detected: TX
+[13:01:03] - Prompt 'GLA': The GLA
+is consistent.
+
+--- Contract ---
+- No validation messages captured.
+
+--- Custom Analysis ---
+[13:02:00] - ⚠️ Photo Label Check Failed.
+
+
+================================================================================
+
+Appraisal Review Log Report
+==============================
+
+File Name: b.pdf
+Start Time: 2026-02-18 09:00:00
+End Time: 2026-02-18 09:05:00
+Retries: 1
+
+--- Subject ---
+[09:01:00] - ✅ Photo Label Check Failed.
+
+"""
+
+
+@pytest.fixture
+def report_messages(tmp_path):
+    path = tmp_path / "review_log.txt"
+    path.write_text(REPORT, encoding="utf-8")
+    return load_review_log(str(path))
+
+
+def test_load_review_log(report_messages):
+    assert list(report_messages["pdf"].astype(str)) == ["a.pdf", "a.pdf", "a.pdf", "b.pdf"]
+    assert list(report_messages["section"].astype(str)) == ["Subject", "Subject", "Custom Analysis", "Subject"]
+    assert list(report_messages["text"].astype(str)) == [
+        "✅ Subject property state detected: TX",
+        "Prompt 'GLA': The GLA\nis consistent.",
+        "⚠️ Photo Label Check Failed.",
+        "✅ Photo Label Check Failed.",
+    ]
+    assert str(report_messages["created_at"].iloc[3]) == "2026-02-18 09:01:00"
+
+
+def test_index_counts_and_lookup(report_messages):
+    index = MessageIndex(report_messages)
+    assert len(index.templates) == 4
+    assert set(index.templates["severity"]) == {"pass", "unknown", "warning"}
+    assert index.counts(("severity",)).to_dict() == {"pass": 2, "warning": 1, "unknown": 1}
+
+    warning_id = template_id("warning", "Photo Label Check Failed.")
+    assert list(index.lookup(warning_id)["pdf"].astype(str)) == ["a.pdf"]
+    assert len(index.lookup(warning_id, section="Custom Analysis", pdf="a.pdf")) == 1
+    assert len(index.lookup(warning_id, pdf="b.pdf")) == 0
+    assert len(index.lookup(section="Subject")) == 3
+    assert len(index.lookup("tmissing")) == 0
+    assert set(index.frame.loc[index.frame["pdf"] == "a.pdf", "state"].astype(str)) == {"TX"}
+
+
+BULLETED_REPORT = """
+================================================================================
+
+Appraisal Review Log Report
+==============================
+
+File Name: c.pdf
+Start Time: 2026-02-19 10:00:00
+End Time: 2026-02-19 10:05:00
+Retries: 0
+
+--- Custom Analysis ---
+[10:01:00] - Prompt 'GLA': Findings:
+- GLA matches sketch
+- Room count differs
+
+Overall the report needs revision.
+[10:02:00] - ✅ Room Count Check Passed.
+
+--- Contract ---
+- No validation messages captured.
+
+"""
+
+
+def test_load_review_log_keeps_bulleted_output_together(tmp_path):
+    path = tmp_path / "review_log.txt"
+    path.write_text(BULLETED_REPORT, encoding="utf-8")
+    messages = load_review_log(str(path))
+
+    assert list(messages["text"].astype(str)) == [
+        "Prompt 'GLA': Findings:\n- GLA matches sketch\n- Room count differs\n\nOverall the report needs revision.",
+        "✅ Room Count Check Passed.",
+    ]
+    assert list(messages["created_at"].astype(str)) == ["2026-02-19 10:01:00", "2026-02-19 10:02:00"]
+
+
+def test_load_datasets_matches_json(tmp_path):
+    path = tmp_path / "validation_dataset.jsonl"
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        # Lines in another layout, and analysis records without a section
+        f.write(json.dumps({"section": "Contract", "pdf": "x.pdf", "text": 'Say "a", "b" \\ é',
+                            "created_at": "2026-03-01T10:00:00"}) + "\n")
+        f.write(json.dumps({"instruction": "i", "input": "PDF: x.pdf", "output": "o"}) + "\n")
+    expected = [r["text"] for r in records] + ['Say "a", "b" \\ é']
+
+    messages = load_datasets(str(path))
+    assert list(messages["text"].astype(str)) == expected
+    assert list(messages["pdf"].astype(str)) == [r["pdf"] for r in records] + ["x.pdf"]
+    assert str(messages["created_at"].iloc[0]) == "2026-02-17 18:09:14.786574"
+
+    # The cache only parses what was appended, and ignores a partial last line
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(records[0]) + "\n" + '{"pdf": "partial')
+    messages = load_datasets(str(path))
+    assert list(messages["text"].astype(str)) == expected + [records[0]["text"]]
+    assert (tmp_path / ".analytics_cache" / "validation_dataset.jsonl.pkl").exists()
+
+    # A rewritten file is parsed again from the start
+    path.write_text(json.dumps(records[1]) + "\n", encoding="utf-8")
+    assert list(load_datasets(str(path))["text"].astype(str)) == [records[1]["text"]]
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from snapshot_store import (
+    ANALYSIS_SNAPSHOT,
+    SnapshotStore,
+    extract_datasets,
+    extract_messages,
+)
+
+# Validation container as rendered by the review app, with the messages the
+# live run recorded for it in datasets/validation_dataset.jsonl.
+CONTAINER_HTML = """
+<div id="validation-container">
+  <div class="validation-message success"><span class="icon">✅</span> Zip Code (76449) is valid.</div>
+  <div class="validation-message warning">
+    <span class="icon">⚠️</span>&nbsp;'Offered&nbsp;for Sale' is 'Yes' but missing details: <b>MLS</b>.
+  </div>
+  <div class="validation-message info">ℹ️ Address Consistency: Verify that "1215 McGinnis Pt, Graford, TX, 76449"
+    matches the Sales Grid, Location Map, Aerial Map, and Subject Photos.<img src="i.png"><embed src="x"></div>
+  <script>console.log("not a message")</script>
+</div>
+"""
+LIVE_MESSAGES = [
+    "✅ Zip Code (76449) is valid.",
+    "⚠️ 'Offered for Sale' is 'Yes' but missing details: MLS.",
+    'ℹ️ Address Consistency: Verify that "1215 McGinnis Pt, Graford, TX, 76449" matches the Sales Grid, '
+    'Location Map, Aerial Map, and Subject Photos.',
+]
+
+
+def test_extract_messages_matches_live_text():
+    assert extract_messages(CONTAINER_HTML) == LIVE_MESSAGES
+
+
+def test_extract_messages_keeps_line_breaks():
+    html = '<div class="validation-message">Prompt \'GLA\': The GLA<br>is &amp; fine</div>'
+    assert extract_messages(html) == ["Prompt 'GLA': The GLA\nis & fine"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots"))
+
+
+def test_entries_use_latest_completed_review(store, tmp_path):
+    store.save_snapshot("/pdfs/a.pdf", "h1", "run1", "Subject", "<div>1</div>")
+    store.save_snapshot("/pdfs/a.pdf", "h1", "run1", "Contract", "<div>2</div>")
+    store.mark_complete("/pdfs/a.pdf", "h1", "run1")
+    # The newer review crashed after Subject, so the complete run1 is kept
+    store.save_snapshot("/pdfs/a.pdf", "h1", "run2", "Subject", "<div>3</div>")
+    # Without any completed run, the latest run is used
+    store.save_snapshot("/pdfs/b.pdf", "h2", "run3", "Subject", "<div>1</div>")
+    store.save_snapshot("/pdfs/b.pdf", "h2", "run4", "Subject", "<div>4</div>")
+
+    entries = list(store.entries())
+    assert [(e["pdf_hash"], e["run_id"], e["section"]) for e in entries] == [
+        ("h1", "run1", "Subject"),
+        ("h1", "run1", "Contract"),
+        ("h2", "run4", "Subject"),
+    ]
+    assert [e["run_id"] for e in store.entries(latest_only=False)] == ["run1", "run1", "run2", "run3", "run4"]
+    # Identical HTML is stored once
+    assert len(list((tmp_path / "snapshots" / "objects").rglob("*.html.gz"))) == 4
+
+
+def test_entries_prefer_newer_completed_review(store):
+    store.save_snapshot("/pdfs/a.pdf", "h1", "run1", "Subject", "<div>1</div>")
+    store.mark_complete("/pdfs/a.pdf", "h1", "run1")
+    store.save_snapshot("/pdfs/a.pdf", "h1", "run2", "Subject", "<div>2</div>")
+    store.mark_complete("/pdfs/a.pdf", "h1", "run2")
+
+    assert [e["run_id"] for e in store.entries()] == ["run2"]
+
+
+def test_extract_datasets_all_runs(store, tmp_path):
+    store.save_snapshot("/pdfs/a.pdf", "h1", "run1", "Subject", CONTAINER_HTML)
+    store.mark_complete("/pdfs/a.pdf", "h1", "run1")
+    store.save_snapshot("/pdfs/a.pdf", "h1", "run2", "Subject", CONTAINER_HTML)
+
+    assert extract_datasets(store.root, str(tmp_path / "latest"), workers=1) == (1, 3, 0)
+    assert extract_datasets(store.root, str(tmp_path / "all"), workers=1, all_runs=True) == (2, 6, 0)
+
+
+def test_extract_datasets_skips_missing_objects(store, tmp_path):
+    store.save_snapshot("/pdfs/a.pdf", "h1", "run1", "Subject", CONTAINER_HTML)
+    analysis = store.save_snapshot(
+        "/pdfs/a.pdf", "h1", "run1", "Custom Analysis",
+        '<div class="validation-message">Prompt \'GLA\': Consistent.</div>',
+        kind=ANALYSIS_SNAPSHOT, prompt="GLA",
+    )
+    missing = store.save_snapshot("/pdfs/b.pdf", "h2", "run2", "Subject", "<div>gone</div>")
+    (tmp_path / "snapshots" / "objects" / missing["object"][:2] / f"{missing['object']}.html.gz").unlink()
+
+    output_dir = tmp_path / "rebuilt"
+    assert extract_datasets(store.root, str(output_dir), workers=2) == (2, 3, 1)
+
+    with open(output_dir / "validation_dataset.jsonl", encoding="utf-8") as f:
+        validation = [json.loads(line) for line in f]
+    assert [r["text"] for r in validation] == LIVE_MESSAGES
+    assert {r["pdf"] for r in validation} == {"a.pdf"}
+    with open(output_dir / "analysis_dataset.jsonl", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [{
+            "instruction": "Analyze the appraisal report for the following: GLA",
+            "input": "PDF: a.pdf",
+            "output": "Consistent.",
+        }]
+    assert analysis["run_id"] == "run1"